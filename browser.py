@@ -0,0 +1,124 @@
+#browser.py
+import os
+import threading
+
+from scheduler import wait_for
+
+# Resolved chromedriver binary, cached so later runs skip webdriver_manager's version lookup
+DRIVER_PATH_CACHE = ".chromedriver_path"
+
+PAGE_LOAD_TIMEOUT = 10  # seconds to wait for a page's content to render
+SETTLE_INTERVAL = 1  # seconds an element count must stay unchanged to count as settled
+
+CHROME_ARGUMENTS = [
+    "--headless",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--window-size=1920,1080"
+]
+
+# One browser per worker thread; all of them are closed by quit_driver()
+_local = threading.local()
+_drivers = []
+_drivers_lock = threading.Lock()
+
+
+def resolve_driver_path(refresh=False):
+    """Return the chromedriver path, downloading it with webdriver_manager only when not cached
+
+    refresh drops the cached path, e.g. after Chrome updated and no longer matches it.
+    """
+    if refresh and os.path.exists(DRIVER_PATH_CACHE):
+        os.remove(DRIVER_PATH_CACHE)
+    if os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+            cached_path = f.read().strip()
+        if cached_path and os.path.exists(cached_path):
+            return cached_path
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    driver_path = ChromeDriverManager().install()
+    with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+        f.write(driver_path)
+    return driver_path
+
+
+def get_driver():
+    """Start headless Chrome on first use in this thread and reuse it afterwards"""
+    driver = getattr(_local, 'driver', None)
+    with _drivers_lock:
+        if driver is not None and driver in _drivers:
+            return driver
+        driver_path = resolve_driver_path()
+
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    try:
+        driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    except SessionNotCreatedException as e:
+        # Usually a cached chromedriver that no longer matches an updated Chrome
+        print(f"⚠️ Could not start Chrome with {driver_path}, resolving chromedriver again: {e.msg}")
+        with _drivers_lock:
+            driver_path = resolve_driver_path(refresh=True)
+        driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    _local.driver = driver
+    with _drivers_lock:
+        _drivers.append(driver)
+    return driver
+
+
+def quit_driver():
+    """Close every browser that was started"""
+    with _drivers_lock:
+        drivers = list(_drivers)
+        _drivers.clear()
+    for driver in drivers:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ Error closing browser: {e}")
+
+
+def load_page(url, ready_xpath):
+    """Open a URL once the host's rate limit allows it and wait until ready_xpath renders"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver = get_driver()
+    wait_for(url)
+    driver.get(url)
+    try:
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+            expected_conditions.presence_of_element_located((By.XPATH, ready_xpath))
+        )
+    except TimeoutException:
+        print(f"⚠️ Page did not finish loading within {PAGE_LOAD_TIMEOUT}s: {url}")
+    return driver
+
+
+def wait_until_settled(driver, xpath, timeout=PAGE_LOAD_TIMEOUT):
+    """Wait until the number of elements matching xpath stops growing, e.g. after a scroll"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    last_count = [-1]
+
+    def settled(driver):
+        count = len(driver.find_elements(By.XPATH, xpath))
+        unchanged = count == last_count[0]
+        last_count[0] = count
+        return unchanged
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=SETTLE_INTERVAL).until(settled)
+    except TimeoutException:
+        print(f"⚠️ Content was still loading after {timeout}s")
@@ -0,0 +1,364 @@
+#catalog.py
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Local catalog shared by all stages
+CATALOG_DB = "catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS departments (
+    url TEXT PRIMARY KEY,
+    level TEXT NOT NULL,              -- 'top' (data.py) or 'sub' (scrape_product_categories.py)
+    discovered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_departments_level ON departments(level);
+
+-- One row per product link with the cheap listing data and its change status:
+-- new / changed (detail scrape pending), unchanged (details up to date), removed
+CREATE TABLE IF NOT EXISTS listings (
+    link TEXT PRIMARY KEY,
+    name TEXT,
+    price TEXT,
+    image_url TEXT,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_listings_status ON listings(status);
+
+-- Departments a product is listed in
+CREATE TABLE IF NOT EXISTS listing_departments (
+    link TEXT NOT NULL,
+    department_url TEXT NOT NULL,
+    PRIMARY KEY (link, department_url)
+);
+CREATE INDEX IF NOT EXISTS idx_listing_departments_department ON listing_departments(department_url);
+
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    price TEXT,
+    main_image TEXT,
+    short_description TEXT,
+    full_description_html TEXT,
+    features TEXT NOT NULL DEFAULT '{}',   -- JSON object
+    scraped_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    product_url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    src TEXT NOT NULL,
+    PRIMARY KEY (product_url, position)
+);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    product_url TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    status TEXT NOT NULL,                  -- uploaded / failed
+    remote_id INTEGER,
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (product_url, destination)
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_destination_status ON uploads(destination, status);
+
+-- Rendered product descriptions keyed by render.content_hash()
+CREATE TABLE IF NOT EXISTS render_cache (
+    content_hash TEXT PRIMARY KEY,
+    html TEXT NOT NULL
+);
+"""
+
+# Legacy handoff files, loaded once by import_legacy()
+LEGACY_DEPARTMENT_FILES = {"top": "extracted_urls.csv", "sub": "extracted2_urls.csv"}
+LEGACY_LISTING_FILE = "products.csv"
+LEGACY_DETAILS_FILE = "scraped_products_full.json"
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_local = threading.local()
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def connect(path=None):
+    """Open the catalog, creating the tables on first use"""
+    path = path or CATALOG_DB
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # WAL lets parallel workers read while one of them writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _schema_lock:
+        if path not in _schema_ready:
+            conn.executescript(SCHEMA)
+            _schema_ready.add(path)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """Connection that commits on success, rolls back on error and is closed afterwards"""
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def listing_fingerprint(row):
+    """Hash the cheap listing fields that signal a product change"""
+    parts = [(row.get(field) or '').strip() for field in ('name', 'price', 'image_url')]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def save_departments(urls, level):
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO departments (url, level, discovered_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET level = excluded.level",
+            [(url, level, now()) for url in urls]
+        )
+
+
+def department_urls(level=None):
+    with transaction() as conn:
+        if level:
+            rows = conn.execute("SELECT url FROM departments WHERE level = ? ORDER BY rowid", (level,))
+        else:
+            rows = conn.execute("SELECT url FROM departments ORDER BY rowid")
+        return [row["url"] for row in rows]
+
+
+def save_listing(rows, departments=None):
+    """Store one listing run and classify every product as new, changed, unchanged or removed
+
+    departments are the department URLs read successfully in this run. A product missing
+    from the run is marked removed only when every department it was listed in is among them.
+    """
+    seen_at = now()
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    links = {}
+    for row in rows:
+        link = (row.get('link') or '').strip()
+        if link:
+            links.setdefault(link, row)
+
+    with transaction() as conn:
+        for link, row in links.items():
+            fingerprint = listing_fingerprint(row)
+            previous = conn.execute(
+                "SELECT fingerprint, status FROM listings WHERE link = ?", (link,)
+            ).fetchone()
+            if previous is None:
+                status = "new"
+            elif previous["fingerprint"] != fingerprint or previous["status"] == "removed":
+                status = "changed"
+            elif previous["status"] in ("new", "changed"):
+                status = previous["status"]  # detail scrape still pending
+            else:
+                status = "unchanged"
+            counts[status] += 1
+            conn.execute(
+                "INSERT INTO listings (link, name, price, image_url, fingerprint, status, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET name = excluded.name, price = excluded.price, "
+                "image_url = excluded.image_url, fingerprint = excluded.fingerprint, "
+                "status = excluded.status, last_seen = excluded.last_seen",
+                (link, row.get('name'), row.get('price'), row.get('image_url'), fingerprint, status, seen_at, seen_at)
+            )
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO listing_departments (link, department_url) VALUES (?, ?)",
+            [(row.get('link').strip(), row.get('source_url')) for row in rows
+             if (row.get('link') or '').strip() and row.get('source_url')]
+        )
+
+        if departments:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS read_departments (url TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM read_departments")
+            conn.executemany("INSERT OR IGNORE INTO read_departments (url) VALUES (?)",
+                             [(url,) for url in departments])
+            counts["removed"] = conn.execute(
+                "UPDATE listings SET status = 'removed' WHERE last_seen < ? AND status != 'removed' "
+                "AND EXISTS (SELECT 1 FROM listing_departments d WHERE d.link = listings.link) "
+                "AND NOT EXISTS (SELECT 1 FROM listing_departments d WHERE d.link = listings.link "
+                "AND d.department_url NOT IN (SELECT url FROM read_departments))",
+                (seen_at,)
+            ).rowcount
+    return counts
+
+
+def product_urls(statuses=None, department_url=None):
+    """Product links, optionally only those with the given change status or in one department"""
+    query = "SELECT l.link FROM listings l"
+    where, params = [], []
+    if department_url:
+        query += " JOIN listing_departments d ON d.link = l.link"
+        where.append("d.department_url = ?")
+        params.append(department_url)
+    if statuses:
+        where.append(f"l.status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    with transaction() as conn:
+        return [row["link"] for row in conn.execute(query + " ORDER BY l.rowid", params)]
+
+
+def status_counts():
+    with transaction() as conn:
+        return {row["status"]: row["n"] for row in
+                conn.execute("SELECT status, COUNT(*) AS n FROM listings GROUP BY status")}
+
+
+def save_product(product_data):
+    """Store a scraped product; a product with a title marks its listing as up to date"""
+    url = product_data["url"]
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO products (url, title, price, main_image, short_description, "
+            "full_description_html, features, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, product_data.get("title"), product_data.get("price"), product_data.get("main_image"),
+             product_data.get("short_description"), product_data.get("full_description_html"),
+             json.dumps(product_data.get("features") or {}, ensure_ascii=False), now())
+        )
+        conn.execute("DELETE FROM images WHERE product_url = ?", (url,))
+        conn.executemany(
+            "INSERT INTO images (product_url, position, src) VALUES (?, ?, ?)",
+            [(url, position, src) for position, src in enumerate(product_data.get("all_images") or [])]
+        )
+        if product_data.get("title"):
+            conn.execute(
+                "UPDATE listings SET status = 'unchanged' WHERE link = ? AND status IN ('new', 'changed')", (url,)
+            )
+
+
+def load_products():
+    """Yield scraped products in the shape final.py produces, plus a 'removed' flag"""
+    conn = connect()
+    try:
+        rows = conn.execute(
+            "SELECT p.*, l.status AS listing_status FROM products p "
+            "LEFT JOIN listings l ON l.link = p.url ORDER BY p.rowid"
+        )
+        for row in rows:
+            images = [image["src"] for image in conn.execute(
+                "SELECT src FROM images WHERE product_url = ? ORDER BY position", (row["url"],)
+            )]
+            yield {
+                "url": row["url"],
+                "title": row["title"],
+                "price": row["price"],
+                "main_image": row["main_image"],
+                "all_images": images,
+                "short_description": row["short_description"],
+                "full_description_html": row["full_description_html"],
+                "features": json.loads(row["features"]),
+                "removed": row["listing_status"] == "removed"
+            }
+    finally:
+        conn.close()
+
+
+def feature_keys():
+    """Distinct non-empty feature names across all products"""
+    with transaction() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT f.key FROM products p, json_each(p.features) f WHERE f.value != '' ORDER BY f.key"
+        )
+        return [row["key"] for row in rows]
+
+
+def set_upload_state(product_url, destination, status, remote_id=None, error=None):
+    """Record an upload attempt; a failed update keeps the remote ID of the earlier upload"""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO uploads (product_url, destination, status, remote_id, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(product_url, destination) DO UPDATE SET status = excluded.status, "
+            "remote_id = COALESCE(excluded.remote_id, uploads.remote_id), error = excluded.error, "
+            "updated_at = excluded.updated_at",
+            (product_url, destination, status, remote_id, error, now())
+        )
+
+
+def upload_states(destination):
+    """Per product URL on a store: its remote ID and whether the upload is newer than the last scrape"""
+    with transaction() as conn:
+        rows = conn.execute(
+            "SELECT u.product_url, u.remote_id, "
+            "u.status = 'uploaded' AND u.updated_at >= COALESCE(p.scraped_at, '') AS up_to_date "
+            "FROM uploads u LEFT JOIN products p ON p.url = u.product_url WHERE u.destination = ?",
+            (destination,)
+        )
+        return {row["product_url"]: {"remote_id": row["remote_id"], "up_to_date": bool(row["up_to_date"])}
+                for row in rows}
+
+
+def _render_cache_connection():
+    # Looked up once per product, so each thread keeps one autocommit connection open
+    conn = getattr(_local, "render_cache", None)
+    if conn is None:
+        conn = _local.render_cache = connect()
+        conn.isolation_level = None
+    return conn
+
+
+def load_rendered(content_hash):
+    row = _render_cache_connection().execute(
+        "SELECT html FROM render_cache WHERE content_hash = ?", (content_hash,)
+    ).fetchone()
+    return row["html"] if row else None
+
+
+def save_rendered(content_hash, html):
+    _render_cache_connection().execute(
+        "INSERT OR REPLACE INTO render_cache (content_hash, html) VALUES (?, ?)", (content_hash, html)
+    )
+
+
+def import_legacy():
+    """Load the old CSV/JSON handoff files into the catalog"""
+    for level, filename in LEGACY_DEPARTMENT_FILES.items():
+        if os.path.exists(filename):
+            with open(filename, newline='', encoding='utf-8') as f:
+                urls = [row[0].strip() for row in csv.reader(f) if row and row[0].strip().startswith('http')]
+            save_departments(urls, level)
+            print(f"✅ Imported {len(urls)} departments from {filename}")
+
+    if os.path.exists(LEGACY_LISTING_FILE):
+        with open(LEGACY_LISTING_FILE, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        counts = save_listing(rows)
+        print(f"✅ Imported {sum(counts.values())} listed products from {LEGACY_LISTING_FILE}")
+
+    if os.path.exists(LEGACY_DETAILS_FILE):
+        with open(LEGACY_DETAILS_FILE, 'r', encoding='utf-8') as f:
+            products = json.load(f)
+        for product in products:
+            save_product(product)
+        print(f"✅ Imported {len(products)} product details from {LEGACY_DETAILS_FILE}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "import":
+        import_legacy()
+    elif command == "status":
+        for status, count in sorted(status_counts().items()):
+            print(f"{status:<10} {count}")
+    else:
+        print("Usage: python catalog.py [status|import]")
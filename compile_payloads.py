@@ -0,0 +1,69 @@
+#compile_payloads.py
+import argparse
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import catalog
+from catalog import load_products
+from post import publishable_products, transform_product
+
+# Precompiled upload payloads, one JSON object per line, gzip-compressed
+PAYLOADS_FILE = "payloads.jsonl.gz"
+CHUNK_SIZE = 200  # products sent to a worker process at a time
+
+
+def _init_worker():
+    # A forked worker must not reuse the parent's SQLite connections
+    catalog._local = threading.local()
+
+
+def _compile(product_data):
+    """Transform one scraped product into its upload payload, already serialized"""
+    return json.dumps(transform_product(product_data), ensure_ascii=False, separators=(',', ':'))
+
+
+def compile_payloads(output_file=PAYLOADS_FILE, workers=None, chunk_size=CHUNK_SIZE):
+    """Compile every publishable catalog product on all cores and write them to output_file"""
+    workers = workers or os.cpu_count() or 1
+    # Products are handed to the pool in bounded batches so the whole feed is never in memory
+    batch_size = workers * chunk_size * 4
+    products = publishable_products(load_products())
+    total = 0
+
+    # Written next to the target and renamed at the end, so an interrupted run never
+    # leaves a truncated file behind for the upload stage
+    temp_file = output_file + ".tmp"
+    print(f"⚙️ Compiling payloads with {workers} process(es)...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor, \
+            gzip.open(temp_file, 'wt', encoding='utf-8', compresslevel=6) as out:
+        for batch in iter(lambda: list(islice(products, batch_size)), []):
+            for line in executor.map(_compile, batch, chunksize=chunk_size):
+                out.write(line + "\n")
+            total += len(batch)
+            print(f"ℹ️ Compiled {total} products")
+    os.replace(temp_file, output_file)
+
+    print(f"✅ Compiled {total} payloads to {output_file}")
+    return total
+
+
+def read_payloads(path=PAYLOADS_FILE):
+    """Yield the precompiled payloads one at a time"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile scraped products into WooCommerce upload payloads")
+    parser.add_argument("--output", default=PAYLOADS_FILE, help="compiled payloads file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="products per worker task")
+    args = parser.parse_args()
+
+    compile_payloads(args.output, args.workers, args.chunk_size)
@@ -1,15 +1,16 @@
 #data.py
 import requests
 from bs4 import BeautifulSoup
-import csv
 import os
 
+from catalog import save_departments
+from scheduler import wait_for
+
 # URL to scrape - now the homepage
 url = "https://abmltd.co.ke/" #paste your website url
 
 # File paths
 html_file = "abmltd_homepage.html" #html path
-csv_file = "extracted_urls.csv" #result csv file 
 
 # Step 1: Scrape the HTML and save it
 def scrape_and_save_html():
@@ -17,6 +18,7 @@ def scrape_and_save_html():
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        wait_for(url)
         response = requests.get(url, headers=headers)
         response.raise_for_status()  # Raise an error for bad status codes
         
@@ -27,7 +29,7 @@ def scrape_and_save_html():
         print(f"Error scraping is HTML: {e}")
 
 # Step 2: Read HTML and extract URLs from specific class
-def extract_urls_to_csv():
+def extract_urls_to_catalog():
     try:
         # Read the saved HTML file
         with open(html_file, 'r', encoding='utf-8') as file:
@@ -49,28 +51,27 @@ def extract_urls_to_csv():
                     href = base_url + href
                 urls.append(href)
         
-        # Save to CSV
-        with open(csv_file, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Extracted URLs'])  # Header
-            for url in urls:
-                writer.writerow([url])
+        # Save to the catalog
+        save_departments(urls, "top")
         
-        print(f"Extracted {len(urls)} URLs and saved to {csv_file}")
+        print(f"Extracted {len(urls)} URLs and saved to the catalog")
         print("Sample URLs extracted:")
         for url in urls[:5]:  # Print first 5 URLs as sample
             print(f"- {url}")
     except Exception as e:
         print(f"Error extracting URLs: {e}")
 
-# Main execution
-if __name__ == "__main__":
+def main():
     # Step 1: Scrape and save HTML
     scrape_and_save_html()
     
-    # Step 2: Extract URLs and save to CSV
+    # Step 2: Extract URLs and save to the catalog
     if os.path.exists(html_file):
-        extract_urls_to_csv()
+        extract_urls_to_catalog()
     else:
 
         print(f"Cannot proceed - HTML file {html_file} not found")
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#dead_letter.py
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Failed products are appended here as JSON lines; later lines for the same id win
+DEAD_LETTER_FILE = "dead_letters.jsonl"
+# Held while appending to or rewriting DEAD_LETTER_FILE, since a replay from cron can
+# overlap with an upload or detail run in another process
+LOCK_FILE = DEAD_LETTER_FILE + ".lock"
+
+# Retry policy per error class: whether replay retries it, how many attempts an
+# item gets in total and the base delay (seconds, doubled per attempt) before an item
+# is due for its next retry
+RETRY_POLICIES = {
+    "rate_limited": {"retry": True, "max_attempts": 8, "backoff": 30},
+    "http_5xx": {"retry": True, "max_attempts": 5, "backoff": 5},
+    "timeout": {"retry": True, "max_attempts": 5, "backoff": 5},
+    "connection": {"retry": True, "max_attempts": 5, "backoff": 10},
+    "scrape": {"retry": True, "max_attempts": 3, "backoff": 10},
+    "error": {"retry": True, "max_attempts": 3, "backoff": 5},
+    # The store rejected the payload itself; retrying the same data won't help
+    "http_4xx": {"retry": False, "max_attempts": 1, "backoff": 0},
+}
+
+_lock = threading.Lock()
+_records = None
+
+
+def classify_error(http_status=None, exception=None):
+    """Map an HTTP status or exception to one of the RETRY_POLICIES error classes"""
+    if http_status is not None:
+        if http_status == 429:
+            return "rate_limited"
+        if http_status >= 500:
+            return "http_5xx"
+        if http_status >= 400:
+            return "http_4xx"
+    if exception is not None:
+        name = type(exception).__name__
+        if "Timeout" in name:
+            return "timeout"
+        if "Connection" in name:
+            return "connection"
+    return "error"
+
+
+def record_id(stage, key, destination=None):
+    return f"{stage}:{destination or ''}:{key}"
+
+
+@contextmanager
+def _file_lock():
+    with open(LOCK_FILE, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after 10s; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_file():
+    """Unresolved records in DEAD_LETTER_FILE; the caller holds _file_lock()"""
+    records = {}
+    if os.path.exists(DEAD_LETTER_FILE):
+        with open(DEAD_LETTER_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("resolved"):
+                    records.pop(record["id"], None)
+                else:
+                    records[record["id"]] = record
+    return records
+
+
+def _load():
+    global _records
+    if _records is None:
+        with _file_lock():
+            _records = _read_file()
+    return _records
+
+
+def _append(record):
+    with _file_lock(), open(DEAD_LETTER_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def record_failure(stage, key, reason, payload, destination=None, http_status=None, exception=None,
+                   error_class=None):
+    """Store a failed item with enough context to replay it later"""
+    with _lock:
+        records = _load()
+        rid = record_id(stage, key, destination)
+        previous = records.get(rid)
+        error_class = error_class or classify_error(http_status, exception)
+        attempts = (previous["attempts"] if previous else 0) + 1
+        policy = RETRY_POLICIES.get(error_class, RETRY_POLICIES["error"])
+        failed_at = datetime.now(timezone.utc)
+        record = {
+            "id": rid,
+            "stage": stage,
+            "key": key,
+            "destination": destination,
+            "reason": reason,
+            "error_class": error_class,
+            "http_status": http_status,
+            "payload": payload,
+            "attempts": attempts,
+            "failed_at": failed_at.isoformat(),
+            # Replay skips the item until then instead of sleeping through the backoff
+            "next_attempt_at": (failed_at + timedelta(seconds=policy["backoff"] * 2 ** (attempts - 1))).isoformat()
+        }
+        records[rid] = record
+        _append(record)
+    print(f"📥 Dead-lettered {stage} '{key}' ({record['error_class']})")
+    return record
+
+
+def resolve(rid):
+    """Drop an item from the dead-letter store after a successful replay"""
+    with _lock:
+        records = _load()
+        if records.pop(rid, None) is not None:
+            _append({"id": rid, "resolved": True})
+
+
+def current_record(rid):
+    with _lock:
+        return _load().get(rid)
+
+
+def pending(stage=None):
+    """Return the unresolved dead-letter records, optionally for one stage"""
+    with _lock:
+        return [r for r in _load().values() if stage is None or r["stage"] == stage]
+
+
+def compact():
+    """Rewrite the store with only the unresolved records"""
+    global _records
+    with _lock, _file_lock():
+        # Re-read first so records other processes appended since we loaded are kept
+        records = _records = _read_file()
+        temp_file = DEAD_LETTER_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_file, DEAD_LETTER_FILE)
+
+
+def _replay_detail(records):
+    import catalog
+    import final
+
+    def replay(record):
+        product = final.scrape_product(record["payload"]["url"])
+        if not product.get("title"):
+            return None
+        catalog.save_product(product)
+        return product
+
+    try:
+        replayed = _retry_all(records, replay)
+    finally:
+        final.quit_driver()
+    print(f"✅ Updated {len(replayed)} products in the catalog")
+
+
+def _replay_upload(records):
+    import post
+
+    destinations = {d["name"]: d for d in post.load_destinations()}
+    contexts = {}
+
+    def replay(record):
+        name = record["destination"]
+        if name not in destinations:
+            print(f"⚠️ Destination '{name}' is no longer configured")
+            return None
+        if name not in contexts:
+            contexts[name] = post.prepare_destination(destinations[name])
+        context = contexts[name]
+        if record["stage"] == "upload_images":
+            return post.upload_images(record["payload"]["product_id"], record["payload"]["images"], context,
+                                      record["key"]) or None
+        return post.upload_product(record["payload"], context) or None
+
+    _retry_all(records, replay)
+
+
+def _retry_all(records, replay):
+    """Retry each due record once per its error class policy; return the successful results
+
+    A failed retry is requeued with a later next_attempt_at, so the next replay picks it up.
+    """
+    results = []
+    now = datetime.now(timezone.utc).isoformat()
+    for record in records:
+        rid = record["id"]
+        current = current_record(rid) or record
+        policy = RETRY_POLICIES.get(current["error_class"], RETRY_POLICIES["error"])
+        allowed = policy["retry"] and current["attempts"] < policy["max_attempts"]
+        if not record.get("force"):
+            if not allowed:
+                print(f"⏭️ Not retrying {record['stage']} '{record['key']}' "
+                      f"({current['error_class']}, {current['attempts']} attempts)")
+                continue
+            if current.get("next_attempt_at", "") > now:
+                print(f"⏳ {record['stage']} '{record['key']}' is not due until {current['next_attempt_at']}")
+                continue
+
+        print(f"\n🔁 Replaying {record['stage']} '{record['key']}' (attempt {current['attempts'] + 1})")
+        error = None
+        try:
+            result = replay(record)
+        except Exception as e:
+            print(f"❌ Replay failed: {e}")
+            error, result = e, None
+        if result is not None:
+            resolve(rid)
+            results.append(result)
+            continue
+
+        # Stage code records its own failures; count the attempt if it didn't
+        latest = current_record(rid)
+        if latest is None or latest["attempts"] == current["attempts"]:
+            record_failure(record["stage"], record["key"], str(error or current["reason"]),
+                           record["payload"], destination=record["destination"], exception=error,
+                           error_class=None if error else current["error_class"])
+    return results
+
+
+def replay(stage=None, force=False):
+    """Retry the dead-lettered items that are due; force retries all of them right away"""
+    records = pending(stage)
+    if force:
+        records = [dict(r, force=True) for r in records]
+    print(f"🔄 Replaying {len(records)} dead-lettered item(s)...")
+
+    detail_records = [r for r in records if r["stage"] == "detail"]
+    upload_records = [r for r in records if r["stage"] in ("upload", "upload_images")]
+    if detail_records:
+        _replay_detail(detail_records)
+    if upload_records:
+        _replay_upload(upload_records)
+
+    compact()
+    print(f"\n✅ Replay finished, {len(pending(stage))} item(s) still dead-lettered")
+
+
+def show(stage=None):
+    records = pending(stage)
+    for record in records:
+        status = f" HTTP {record['http_status']}" if record["http_status"] else ""
+        print(f"{record['stage']:<14} {record['error_class']:<12}{status} x{record['attempts']}  {record['key']}  - {record['reason'][:120]}")
+    print(f"{len(records)} dead-lettered item(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and replay failed products")
+    parser.add_argument("command", choices=["list", "replay"])
+    parser.add_argument("--stage", choices=["detail", "upload", "upload_images"], help="only this stage")
+    parser.add_argument("--force", action="store_true",
+                        help="retry every item now, including ones not yet due or whose error class is not retried")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        show(args.stage)
+    else:
+        replay(args.stage, args.force)
@@ -0,0 +1,113 @@
+#export_csv.py
+import argparse
+import csv
+
+from catalog import feature_keys, load_products
+from post import (
+    ATTRIBUTES_TO_CREATE,
+    category_path,
+    clean_price,
+    publishable_products,
+    transform_product,
+)
+
+# Output settings
+OUTPUT_PREFIX = "woocommerce_import"  # files are named woocommerce_import_0001.csv, ...
+CHUNK_SIZE = 5000  # products per file, keep it small enough for the server's importer
+
+# Column layout of WooCommerce's built-in product CSV importer
+BASE_COLUMNS = [
+    "Type", "SKU", "Name", "Published", "Is featured?", "Visibility in catalog",
+    "Description", "In stock?", "Regular price", "Categories", "Images"
+]
+
+
+def csv_header(meta_keys):
+    header = list(BASE_COLUMNS)
+    for i, _ in enumerate(ATTRIBUTES_TO_CREATE, start=1):
+        header += [
+            f"Attribute {i} name",
+            f"Attribute {i} value(s)",
+            f"Attribute {i} visible",
+            f"Attribute {i} global"
+        ]
+    header += [f"Meta: {key}" for key in meta_keys]
+    return header
+
+
+def csv_row(product_data, meta_keys):
+    """Build one importer row from a scraped product using the same transforms as post.py"""
+    product = transform_product(product_data)
+    price = clean_price(product_data.get('price'))
+    images = sorted(product['images'], key=lambda image: image['position'])
+
+    row = [
+        product['type'],
+        # Same SKU as the REST upload, so re-imports and later uploads update this product
+        product['sku'],
+        product['name'],
+        1 if product['status'] == "publish" else 0,
+        0,
+        "visible",
+        product['description'],
+        1,
+        "" if price is None else price,
+        # Importer syntax: "Parent > Child", several categories separated by commas
+        " > ".join(category_path(product['category_leaf'])),
+        ", ".join(image['src'] for image in images)
+    ]
+
+    # One fixed column group per known attribute so every chunk shares the same header
+    for attr_name in ATTRIBUTES_TO_CREATE:
+        value = product['attributes'].get(attr_name)
+        if value:
+            row += [attr_name, value, 1, 1]
+        else:
+            row += ["", "", "", ""]
+
+    meta = {item['key']: item['value'] for item in product['meta_data']}
+    row += [meta.get(key, "") for key in meta_keys]
+    return row
+
+
+def export_products(output_prefix=OUTPUT_PREFIX, chunk_size=CHUNK_SIZE):
+    """Stream catalog products into chunked importer CSV files and return the file names"""
+    # Features are also stored as product meta, as in post.py; the importer needs every
+    # meta key as a column up front
+    meta_keys = feature_keys()
+    header = csv_header(meta_keys)
+    files = []
+    out = writer = None
+    rows_in_chunk = 0
+    total = 0
+
+    try:
+        for product in publishable_products(load_products()):
+            if writer is None or rows_in_chunk >= chunk_size:
+                if out:
+                    out.close()
+                filename = f"{output_prefix}_{len(files) + 1:04d}.csv"
+                out = open(filename, 'w', newline='', encoding='utf-8')
+                writer = csv.writer(out)
+                writer.writerow(header)
+                files.append(filename)
+                rows_in_chunk = 0
+
+            writer.writerow(csv_row(product, meta_keys))
+            rows_in_chunk += 1
+            total += 1
+    finally:
+        if out:
+            out.close()
+
+    print(f"✅ Exported {total} products to {len(files)} file(s): {', '.join(files)}")
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export scraped products as WooCommerce importer CSV files")
+    parser.add_argument("--output-prefix", default=OUTPUT_PREFIX, help="prefix of the generated CSV files")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="products per CSV file")
+    args = parser.parse_args()
+
+    export_products(args.output_prefix, args.chunk_size)
@@ -1,15 +1,17 @@
 #final.py file
-import csv
-import json
-import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from browser import load_page, quit_driver
+from catalog import product_urls, save_product
+from dead_letter import record_failure, record_id, resolve
+
+TITLE_XPATH = "//h1[contains(@class, 'font-bold')]"
 
 def scrape_product(url):
-    driver.get(url)
-    time.sleep(3)  # Let page load fully
+    from selenium.webdriver.common.by import By
+
+    driver = load_page(url, TITLE_XPATH)  # Let page load fully
 
     product_data = {
         "url": url,
@@ -24,7 +26,7 @@ def scrape_product(url):
 
     try:
         # Main product title
-        product_data["title"] = driver.find_element(By.XPATH, "//h1[contains(@class, 'font-bold')]").text.strip()
+        product_data["title"] = driver.find_element(By.XPATH, TITLE_XPATH).text.strip()
         print(f"✔ Title: {product_data['title']}")
     except Exception as e:
         print(f"❌ Error is getting in the title: {e}")
@@ -104,38 +106,45 @@ def scrape_product(url):
 
     return product_data
 
-# [Rest of your script remains the same...]
-# Setup Selenium (Headless Mode)
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-options.add_argument("--window-size=1920,1080")
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-results = []
-csv_file_path = "products.csv"  # Your CSV file path
-
-# Read CSV and find product URLs
-with open(csv_file_path, newline="", encoding="utf-8") as csvfile:
-    reader = csv.reader(csvfile)
-    for row in reader:
-        for cell in row:
-            if "https://abmltd.co.ke/products/" in cell:
-                try:
-                    product_data = scrape_product(cell)
-                    results.append(product_data)
-                    print(f"✅ Scraped: {cell}")
-                except Exception as e:
-                    print(f"❌ Error scraping {cell}: {e}")
-                time.sleep(2)  # Be polite between requests
-
-driver.quit()
-
-# Save results to JSON
-with open("scraped_products_full.json", "w", encoding="utf-8") as f:
-    json.dump(results, f, indent=4, ensure_ascii=False)
-
-print("🎯 Scraping has been complete. Data will saved to scraped_products_full.json file")
+def scrape_and_record(url):
+    """Scrape one product page into the catalog, dead-lettering it on failure"""
+    try:
+        product_data = scrape_product(url)
+        if not product_data["title"]:
+            # Keep the previously stored details rather than overwrite them with a broken page
+            record_failure("detail", url, "Title not found on product page", {"url": url},
+                           error_class="scrape")
+            return None
+        save_product(product_data)
+        print(f"✅ Scraped: {url}")
+        resolve(record_id("detail", url))
+        return product_data
+    except Exception as e:
+        print(f"❌ Error scraping {url}: {e}")
+        record_failure("detail", url, str(e), {"url": url}, exception=e)
+        return None
+
+def main(pending_only=False, workers=1, queue=None):
+    # Product URLs from the catalog; pending ones are new or changed since the last listing
+    statuses = ["new", "changed"] if pending_only else ["new", "changed", "unchanged"]
+    urls = product_urls(statuses)
+    print(f"🔎 {len(urls)} product pages to scrape")
+
+    if queue:
+        # Workers on other nodes share the product pages through the queue
+        from work_queue import run_distributed
+        run_distributed("product", urls, queue, threads=workers)
+        return
+
+    # Workers run in parallel; the scheduler paces requests to the source site
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = [product for product in executor.map(scrape_and_record, urls) if product]
+    finally:
+        quit_driver()
 
+    print(f"🎯 Scraping has been complete. {len(results)} products saved to the catalog")
 
+if __name__ == "__main__":
+    # --pending: only scrape products whose listing is new or changed
+    main(pending_only="--pending" in sys.argv[1:])
@@ -0,0 +1,153 @@
+#main.py
+import argparse
+
+# Stage modules (selenium, requests, bs4) are imported inside each stage so that
+# commands which don't need them start without loading them or a browser.
+
+STAGES = ["discover", "list", "detail", "compile", "upload"]
+
+
+def run_import(args):
+    """Load the old CSV/JSON handoff files into the catalog"""
+    import catalog
+
+    catalog.import_legacy()
+
+
+def run_discover(args):
+    """Find department and brand URLs on the source site"""
+    import data
+    import scrape_product_categories
+
+    data.main()
+    scrape_product_categories.main()
+
+
+def run_list(args):
+    """Collect name, price, link and image for every product listing"""
+    import product
+
+    product.main(workers=args.workers, queue=args.queue)
+
+
+def run_detail(args):
+    """Scrape product detail pages (only new/changed ones in incremental mode)"""
+    import final
+
+    final.main(pending_only=args.incremental, workers=args.workers, queue=args.queue)
+
+
+def run_compile(args):
+    """Turn scraped products into upload payloads on all cores"""
+    import compile_payloads
+
+    args.payloads = args.payloads or compile_payloads.PAYLOADS_FILE
+    compile_payloads.compile_payloads(args.payloads)
+
+
+def run_upload(args):
+    """Publish products to the configured WooCommerce stores (precompiled payloads if any)"""
+    import post
+
+    print("🛒 Starting WooCommerce Product Import")
+    print("------------------------------------")
+    post.process_products(args.payloads)
+    print("\n✅ Import process completed")
+
+
+def run_export(args):
+    """Write WooCommerce importer CSV files instead of uploading"""
+    import export_csv
+
+    export_csv.export_products(chunk_size=args.chunk_size)
+
+
+def run_worker(args):
+    """Scrape URLs from the shared work queue for the node running list/detail --queue"""
+    import work_queue
+
+    try:
+        work_queue.run_worker(args.queue or work_queue.QUEUE_DB, threads=args.workers, wait=True)
+    except KeyboardInterrupt:
+        print("\n⚠️ Worker stopped by user")
+
+
+def run_replay(args):
+    """Retry only the products recorded in the dead-letter store"""
+    import dead_letter
+
+    dead_letter.replay(force=args.force)
+
+
+STAGE_RUNNERS = {
+    "import": run_import,
+    "discover": run_discover,
+    "list": run_list,
+    "detail": run_detail,
+    "compile": run_compile,
+    "upload": run_upload,
+    "export": run_export,
+    "replay": run_replay,
+    "worker": run_worker,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Scrape products from the source site and publish them to WooCommerce"
+    )
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        metavar="stage",
+        help=f"stages to run in order: {', '.join(STAGE_RUNNERS)} (default: {' '.join(STAGES)})"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="detail stage only re-scrapes products whose listing changed"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="parallel browsers for the list and detail stages (paced by the per-host rate limits)"
+    )
+    parser.add_argument(
+        "--queue",
+        help="shared work queue database; list and detail hand their URLs to it so that "
+             "worker nodes (python main.py worker --queue ...) scrape them too"
+    )
+    parser.add_argument(
+        "--payloads",
+        help="payloads file written by the compile stage and streamed by the upload stage "
+             "(without it, upload compiles products itself unless compile ran first)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="products per CSV file for the export stage"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="replay stage also retries items rejected by the store (HTTP 4xx) or not yet due"
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    stages = args.stages or STAGES
+    unknown = [stage for stage in stages if stage not in STAGE_RUNNERS]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    for stage in stages:
+        print(f"\n▶️ Stage: {stage}")
+        STAGE_RUNNERS[stage](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
+import hashlib
 import json
+import os
+import sys
+import tempfile
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from urllib.parse import urlparse
-import time
+
+from catalog import set_upload_state, upload_states
+from dead_letter import record_failure, record_id, resolve
+from render import render_description
+from scheduler import scheduler, wait_for
 
 # WooCommerce API credentials
 WC_CONSUMER_KEY = '' #paste your woo_commerce key
@@ -14,7 +25,21 @@ CATEGORIES_URL = f'{BASE_URL}/products/categories'
 ATTRIBUTES_URL = f'{BASE_URL}/products/attributes'
 
 
-SOURCE_FILE = 'scraped_products_full.json'
+# Destination stores. When destinations.json exists it holds a list of stores, e.g.
+# [{"name": "main", "base_url": "https://shop.example/wp-json/wc/v3",
+#   "consumer_key": "ck_...", "consumer_secret": "cs_...",
+#   "category_map": {"new pantum printer": 42}, "rate_limit": 1.0, "workers": 2}]
+# category_map pins a leaf category name to a category ID on that store,
+# rate_limit is the maximum number of API requests per second for that store's host
+# and workers is the number of products uploaded to it concurrently.
+DESTINATIONS_FILE = 'destinations.json'
+DEFAULT_RATE_LIMIT = 0.5  # requests per second
+
+# SKUs are derived from the source product URL so REST uploads and CSV imports of the
+# same product always match, e.g. .../products/pantum-bm5100adw__79bd9f37-... -> abm-79bd9f37-...
+SKU_PREFIX = 'abm-'
+
+stop_event = threading.Event()  # set on Ctrl+C so store workers stop after the current product
 
 # Category hierarchy
 CATEGORY_HIERARCHY = {
@@ -46,6 +71,14 @@ ATTRIBUTES_TO_CREATE = [
     "Connectivity", "Print Speed"
 ]
 
+def product_sku(source_url):
+    """Stable SKU from the id at the end of the source URL's slug"""
+    slug = urlparse(source_url or '').path.rstrip('/').rsplit('/', 1)[-1]
+    product_id = slug.rsplit('__', 1)[-1] if slug else ''
+    if not product_id:
+        product_id = hashlib.sha1((source_url or '').encode('utf-8')).hexdigest()[:16]
+    return f"{SKU_PREFIX}{product_id}"
+
 def clean_price(price_str):
     """Convert price string to float"""
     if not price_str:
@@ -69,28 +102,55 @@ def is_valid_image_url(url):
         return False
 
 def format_product_display(product_data):
-    """Format product description HTML"""
-    features = product_data.get('features', {})
-    non_empty_features = {k: v for k, v in features.items() if v}
-    
-    description_html = f"<h2>{product_data.get('price', '')}</h2>"
-    
-    if non_empty_features:
-        description_html += """
-        <div class="product-attributes">
-            <h3>Specifications</h3>
-            <table>
-        """
-        for key, value in non_empty_features.items():
-            description_html += f"<tr><td><strong>{key}</strong></td><td>{value}</td></tr>"
-        description_html += "</table></div>"
-    
-    full_description = product_data.get('full_description_html', '')
-    description_html += f"<hr><div class='product-description'>{full_description}</div>"
+    """Format product description HTML (escaped, sanitized and cached, see render.py)"""
+    return render_description(product_data)
+
+def collect_product_images(product_data):
+    """Build the WooCommerce image list, main image first"""
+    valid_images = []
+    main_image = product_data.get('main_image')
+    if is_valid_image_url(main_image):
+        valid_images.append({"src": main_image, "position": 0})
     
-    return description_html
+    for idx, img_url in enumerate(product_data.get('all_images', []), start=1):
+        if img_url != main_image and is_valid_image_url(img_url):
+            valid_images.append({"src": img_url, "position": idx})
+    return valid_images
+
+def load_destinations():
+    """Load destination stores, falling back to the single store configured above"""
+    if os.path.exists(DESTINATIONS_FILE):
+        with open(DESTINATIONS_FILE, 'r', encoding='utf-8') as f:
+            stores = json.load(f)
+    else:
+        stores = [{
+            "name": urlparse(BASE_URL).netloc,
+            "base_url": BASE_URL,
+            "consumer_key": WC_CONSUMER_KEY,
+            "consumer_secret": WC_CONSUMER_SECRET
+        }]
+
+    destinations = []
+    for store in stores:
+        base_url = store['base_url'].rstrip('/')
+        rate_limit = float(store.get('rate_limit') or DEFAULT_RATE_LIMIT)
+        scheduler.set_limit(urlparse(base_url).netloc.lower(), rate_limit)
+        destinations.append({
+            "name": store.get('name') or urlparse(base_url).netloc,
+            "auth": (store.get('consumer_key', ''), store.get('consumer_secret', '')),
+            "products_url": f'{base_url}/products',
+            "categories_url": f'{base_url}/products/categories',
+            "attributes_url": f'{base_url}/products/attributes',
+            "category_map": {k.lower(): v for k, v in store.get('category_map', {}).items()},
+            "workers": int(store.get('workers') or 1)
+        })
+    return destinations
 
-def create_category_hierarchy(parent_id=None, hierarchy=None, existing_categories=None):
+def throttle(destination):
+    """Wait until the shared scheduler allows another request to the store's host"""
+    wait_for(destination['products_url'])
+
+def create_category_hierarchy(destination, parent_id=None, hierarchy=None, existing_categories=None):
     """Create category hierarchy recursively"""
     if hierarchy is None:
         hierarchy = CATEGORY_HIERARCHY
@@ -106,9 +166,10 @@ def create_category_hierarchy(parent_id=None, hierarchy=None, existing_categorie
         
         if not existing_category:
             category_data = {"name": name, "parent": parent_id or 0}
+            throttle(destination)
             response = requests.post(
-                CATEGORIES_URL,
-                auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
+                destination['categories_url'],
+                auth=destination['auth'],
                 headers={"Content-Type": "application/json"},
                 json=category_data,
                 timeout=30
@@ -129,6 +190,7 @@ def create_category_hierarchy(parent_id=None, hierarchy=None, existing_categorie
         
         if children:
             child_categories = create_category_hierarchy(
+                destination,
                 parent_id=existing_category['id'],
                 hierarchy=children,
                 existing_categories=existing_categories
@@ -137,14 +199,15 @@ def create_category_hierarchy(parent_id=None, hierarchy=None, existing_categorie
     
     return created_categories
 
-def create_attributes():
+def create_attributes(destination):
     """Create product attributes if they don't exist"""
-    print("\n🔍 Checking/Creating the product attributes...")
+    print(f"\n🔍 [{destination['name']}] Checking/Creating the product attributes...")
     
     try:
+        throttle(destination)
         response = requests.get(
-            ATTRIBUTES_URL,
-            auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
+            destination['attributes_url'],
+            auth=destination['auth'],
             params={'per_page': 100},
             timeout=30
         )
@@ -177,9 +240,10 @@ def create_attributes():
             }
             
             try:
+                throttle(destination)
                 create_response = requests.post(
-                    ATTRIBUTES_URL,
-                    auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
+                    destination['attributes_url'],
+                    auth=destination['auth'],
                     headers={"Content-Type": "application/json"},
                     json=attribute_data,
                     timeout=30
@@ -199,8 +263,8 @@ def create_attributes():
     
     return existing_attributes + created_attributes
 
-def determine_category(features, product_title, existing_categories):
-    """Determine the appropriate category with improved matching"""
+def category_leaf_name(features, product_title):
+    """Pick the leaf category name for a product and whether it may need the ink category"""
     brand = features.get('Brand', '').lower()
     condition = features.get('Condition', '').lower()
     product_type = features.get('Type', '').lower()
@@ -258,9 +322,35 @@ def determine_category(features, product_title, existing_categories):
             else:
                 leaf_name = "new printer"
     
-    # Find category by leaf name with flexible matching
     leaf_name = leaf_name.split('\\')[-1] if '\\' in leaf_name else leaf_name
+    needs_ink_category = 'ink' in leaf_name.lower() or 'ink' in normalized_title or is_dx_model
+    return leaf_name, needs_ink_category
+
+def category_path(leaf_name):
+    """Return the CATEGORY_HIERARCHY names from the root down to a leaf category"""
+    wanted = leaf_name.lower()
+
+    def walk(hierarchy, ancestors):
+        for name, children in hierarchy.items():
+            path = ancestors + [name]
+            if name.split('\\')[-1].lower() == wanted:
+                return path
+            if children:
+                found = walk(children, path)
+                if found:
+                    return found
+        return None
+
+    return walk(CATEGORY_HIERARCHY, []) or [leaf_name]
+
+def determine_category(leaf_name, needs_ink_category, product_title, existing_categories, destination):
+    """Determine the appropriate category with improved matching"""
+    # Categories pinned in the destination config win over name matching
+    mapped_id = destination['category_map'].get(leaf_name.lower())
+    if mapped_id:
+        return {"id": mapped_id, "name": leaf_name}
     
+    # Find category by leaf name with flexible matching
     # Create a list of possible matches
     possible_matches = [
         leaf_name.lower(),
@@ -285,7 +375,7 @@ def determine_category(features, product_title, existing_categories):
             break
     
     # Special handling for ink products - create category if needed
-    if not category and ('ink' in leaf_name.lower() or 'ink' in normalized_title or is_dx_model):
+    if not category and needs_ink_category:
         ink_category_name = "ink & toner master"
         print(f"🔄 Special handling for ink/DX product: {product_title}")
         
@@ -306,9 +396,10 @@ def determine_category(features, product_title, existing_categories):
                 0
             )
             try:
+                throttle(destination)
                 response = requests.post(
-                    CATEGORIES_URL,
-                    auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
+                    destination['categories_url'],
+                    auth=destination['auth'],
                     json={
                         "name": ink_category_name,
                         "parent": parent_id
@@ -336,28 +427,127 @@ def determine_category(features, product_title, existing_categories):
     
     return category
 
-def upload_product(product_data, existing_categories, existing_attributes):
-    """Upload product with proper attributes"""
-    try:
-        product_name = product_data.get('title', '')
-        if not product_name:
+def transform_product(product_data):
+    """Turn a scraped product into store-independent upload data, done once for all stores"""
+    product_name = product_data.get('title', '')
+    features = product_data.get('features', {})
+    leaf_name, needs_ink_category = category_leaf_name(features, product_name)
+    
+    return {
+        "source_url": product_data.get('url'),
+        "sku": product_sku(product_data.get('url')),
+        "name": product_name,
+        "type": "simple",
+        "status": "publish",
+        "description": format_product_display(product_data),
+        "regular_price": str(clean_price(product_data.get('price'))),
+        "meta_data": [{"key": key, "value": value} for key, value in features.items() if key and value],
+        "attributes": {
+            key: str(value) for key, value in features.items()
+            if key and value and key in ATTRIBUTES_TO_CREATE
+        },
+        "category_leaf": leaf_name,
+        "needs_ink_category": needs_ink_category,
+        "images": collect_product_images(product_data)
+    }
+
+def publishable_products(products):
+    """Yield scraped products that should be published, skipping removed and unnamed ones"""
+    for product in products:
+        if product.get('removed'):
+            print(f"⏭️ Skipping product no longer listed on the source: {product.get('title')}")
+            continue
+        if not product.get('title'):
             print(f"⏭️ Skipping product: No name provided")
-            return False
-        
+            continue
+        yield product
+
+def prepare_destination(destination):
+    """Create attributes and categories on a store and load the ones it already has"""
+    # Create attributes first
+    existing_attributes = create_attributes(destination)
+    if not existing_attributes:
+        print(f"⚠️ [{destination['name']}] Warning: No attributes is available")
+    
+    # Load existing categories
+    print(f"\n🔍 [{destination['name']}] Fetching existing categories...")
+    throttle(destination)
+    categories_response = requests.get(
+        destination['categories_url'],
+        auth=destination['auth'],
+        params={'per_page': 100},
+        timeout=30
+    )
+    
+    existing_categories = categories_response.json() if categories_response.status_code == 200 else []
+    
+    # Create category hierarchy
+    print(f"\n🌳 [{destination['name']}] Creating category hierarchy...")
+    created_categories = create_category_hierarchy(destination, existing_categories=existing_categories)
+    existing_categories.extend(created_categories)
+    print(f"ℹ️ [{destination['name']}] Total categories available: {len(existing_categories)}")
+    
+    return {
+        "destination": destination,
+        "categories": existing_categories,
+        # Resolved category per (leaf name, needs ink category), filled in by upload_product
+        "category_cache": {},
+        # Products uploaded before, updated in place instead of created again
+        "uploads": upload_states(destination['name']),
+        # First attribute wins on duplicate names, as with a linear search
+        "attributes": {attr['name'].lower(): attr for attr in reversed(existing_attributes)}
+    }
+
+def duplicate_sku_product_id(response, destination, sku):
+    """ID of the store product that already has this SKU when a create was rejected for it"""
+    if not sku or response.status_code != 400:
+        return None
+    try:
+        error = response.json()
+    except ValueError:
+        return None
+    if not isinstance(error, dict) or error.get('code') != 'product_invalid_sku':
+        return None
+    resource_id = (error.get('data') or {}).get('resource_id')
+    if resource_id:
+        return resource_id
+    # Older WooCommerce versions don't say which product has the SKU
+    throttle(destination)
+    lookup = requests.get(destination['products_url'], auth=destination['auth'], params={'sku': sku}, timeout=30)
+    matches = lookup.json() if lookup.status_code == 200 else []
+    return matches[0]['id'] if matches else None
+
+def upload_product(product, context):
+    """Upload a transformed product with proper attributes to one store"""
+    destination = context['destination']
+    product_name = product['name']
+    try:
         # Prepare basic product data
         wc_product = {
             "name": product_name,
-            "type": "simple",
-            "status": "publish",
-            "description": format_product_display(product_data),
-            "regular_price": str(clean_price(product_data.get('price'))),
-            "meta_data": [],
+            "type": product['type'],
+            "status": product['status'],
+            "description": product['description'],
+            "regular_price": product['regular_price'],
+            "meta_data": product['meta_data'],
             "attributes": []
         }
+        if product.get('sku'):
+            wc_product["sku"] = product['sku']
 
-        # Handle categories
-        features = product_data.get('features', {})
-        category = determine_category(features, product_name, existing_categories)
+        # Handle categories; products sharing a leaf name resolve to the same category
+        category_key = (product['category_leaf'], product['needs_ink_category'])
+        category = context['category_cache'].get(category_key)
+        if category is None:
+            category = determine_category(
+                product['category_leaf'],
+                product['needs_ink_category'],
+                product_name,
+                context['categories'],
+                destination
+            )
+            if category:
+                context['category_cache'][category_key] = category
         
         if category:
             wc_product["categories"] = [{"id": category['id']}]
@@ -366,131 +556,226 @@ def upload_product(product_data, existing_categories, existing_attributes):
             print("⚠️ No matching category is found")
 
         # Handle attributes
-        for key, value in features.items():
-            if key and value:
-                # Add to metadata
-                wc_product["meta_data"].append({
-                    "key": key,
-                    "value": value
+        for key, value in product['attributes'].items():
+            matching_attr = context['attributes'].get(key.lower())
+            if matching_attr:
+                wc_product["attributes"].append({
+                    "id": matching_attr['id'],
+                    "name": key,
+                    "position": 0,
+                    "visible": True,
+                    "variation": False,
+                    "options": [value]
                 })
-                
-                # Add as product attribute if in our list
-                if key in ATTRIBUTES_TO_CREATE:
-                    matching_attr = next(
-                        (attr for attr in existing_attributes if attr['name'].lower() == key.lower()),
-                        None
-                    )
-                    
-                    if matching_attr:
-                        wc_product["attributes"].append({
-                            "id": matching_attr['id'],
-                            "name": key,
-                            "position": 0,
-                            "visible": True,
-                            "variation": False,
-                            "options": [str(value)]
-                        })
-
-        # Create product
-        response = requests.post(
-            PRODUCTS_URL,
-            auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
-            headers={"Content-Type": "application/json"},
-            json=wc_product,
-            timeout=60
-        )
+
+        # Update the product created by an earlier run, or create it
+        remote_id = context['uploads'].get(product.get('source_url'), {}).get('remote_id')
+        response = None
+        action = "updated"
+        if remote_id:
+            throttle(destination)
+            response = requests.put(
+                f"{destination['products_url']}/{remote_id}",
+                auth=destination['auth'],
+                headers={"Content-Type": "application/json"},
+                json=wc_product,
+                timeout=60
+            )
+            if response.status_code == 404:
+                print(f"ℹ️ [{destination['name']}] Product {remote_id} no longer exists, creating it again")
+                response = None
+        if response is None:
+            action = "created"
+            throttle(destination)
+            response = requests.post(
+                destination['products_url'],
+                auth=destination['auth'],
+                headers={"Content-Type": "application/json"},
+                json=wc_product,
+                timeout=60
+            )
+            existing_id = duplicate_sku_product_id(response, destination, product.get('sku'))
+            if existing_id:
+                # Already on the store, e.g. from a CSV import: update that product instead
+                print(f"ℹ️ [{destination['name']}] SKU {product['sku']} exists as product {existing_id}, updating it")
+                action = "updated"
+                throttle(destination)
+                response = requests.put(
+                    f"{destination['products_url']}/{existing_id}",
+                    auth=destination['auth'],
+                    headers={"Content-Type": "application/json"},
+                    json=wc_product,
+                    timeout=60
+                )
 
         if response.status_code not in [200, 201]:
-            print(f"❌ Failed to create product '{product_name}': {response.status_code} - {response.text}")
+            print(f"❌ [{destination['name']}] Failed to upload product '{product_name}': {response.status_code} - {response.text}")
+            if product.get('source_url'):
+                set_upload_state(product['source_url'], destination['name'], "failed",
+                                 error=f"{response.status_code} - {response.text[:500]}")
+            record_failure("upload", product.get('source_url') or product_name, response.text[:2000], product,
+                           destination=destination['name'], http_status=response.status_code)
             return False
 
         created_product = response.json()
         product_id = created_product['id']
-        print(f"✅ Product '{product_name}' created successfully (ID: {product_id})")
+        print(f"✅ [{destination['name']}] Product '{product_name}' {action} successfully (ID: {product_id})")
+        if product.get('source_url'):
+            set_upload_state(product['source_url'], destination['name'], "uploaded", remote_id=product_id)
+        resolve(record_id("upload", product.get('source_url') or product_name, destination['name']))
 
         # Handle images
-        valid_images = []
-        main_image = product_data.get('main_image')
-        if is_valid_image_url(main_image):
-            valid_images.append({"src": main_image, "position": 0})
-        
-        for idx, img_url in enumerate(product_data.get('all_images', []), start=1):
-            if img_url != main_image and is_valid_image_url(img_url):
-                valid_images.append({"src": img_url, "position": idx})
-
-        if valid_images:
-            print(f"🖼️ Attempting to add {len(valid_images)} images...")
-            update_response = requests.put(
-                f"{PRODUCTS_URL}/{product_id}",
-                auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
-                headers={"Content-Type": "application/json"},
-                json={"images": valid_images},
-                timeout=60
-            )
-            
-            if update_response.status_code in [200, 201]:
-                print(f"  ✅ Images added successfully")
-            else:
-                print(f"  ⚠️ Could not add images: {update_response.status_code} - {update_response.text}")
+        if product['images']:
+            upload_images(product_id, product['images'], context, product.get('source_url') or product_name)
 
         return True
 
     except Exception as e:
-        print(f"❌ Error processing product '{product_name}': {str(e)}")
+        print(f"❌ [{destination['name']}] Error processing product '{product_name}': {str(e)}")
+        if product.get('source_url'):
+            set_upload_state(product['source_url'], destination['name'], "failed", error=str(e))
+        record_failure("upload", product.get('source_url') or product_name, str(e), product,
+                       destination=destination['name'], exception=e)
         return False
-    
-def process_products():
-    """Main function to process products"""
+
+def upload_images(product_id, valid_images, context, key=None):
+    """Attach images to a created product"""
+    destination = context['destination']
+    key = key or str(product_id)
+    payload = {"product_id": product_id, "images": valid_images}
     try:
-        # Create attributes first
-        existing_attributes = create_attributes()
-        if not existing_attributes:
-            print("⚠️ Warning: No attributes is available")
-        
-        # Load existing categories
-        print("\n🔍 Fetching existing categories...")
-        categories_response = requests.get(
-            CATEGORIES_URL,
-            auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
-            params={'per_page': 100},
-            timeout=30
+        print(f"🖼️ Attempting to add {len(valid_images)} images...")
+        throttle(destination)
+        update_response = requests.put(
+            f"{destination['products_url']}/{product_id}",
+            auth=destination['auth'],
+            headers={"Content-Type": "application/json"},
+            json={"images": valid_images},
+            timeout=60
         )
         
-        existing_categories = categories_response.json() if categories_response.status_code == 200 else []
-        
-        # Create category hierarchy
-        print("\n🌳 Creating category hierarchy...")
-        created_categories = create_category_hierarchy(existing_categories=existing_categories)
-        existing_categories.extend(created_categories)
-        print(f"ℹ️ Total categories available: {len(existing_categories)}")
-
-        # Load product data
-        print(f"\n📂 Loading products from {SOURCE_FILE}...")
-        with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-
-        # Process products
-        print(f"\n🔄 Starting to process {len(products)} products...")
-        success_count = 0
-        
-        for i, product in enumerate(products, start=1):
-            print(f"\n--- Processing product {i}/{len(products)} ---")
-            if upload_product(product, existing_categories, existing_attributes):
-                success_count += 1
-            time.sleep(2)  # Be gentle with the API
+        if update_response.status_code in [200, 201]:
+            print(f"  ✅ Images added successfully")
+            resolve(record_id("upload_images", key, destination['name']))
+            return True
+
+        print(f"  ⚠️ Could not add images: {update_response.status_code} - {update_response.text}")
+        record_failure("upload_images", key, update_response.text[:2000], payload,
+                       destination=destination['name'], http_status=update_response.status_code)
+    except Exception as e:
+        print(f"  ⚠️ Could not add images: {str(e)}")
+        record_failure("upload_images", key, str(e), payload, destination=destination['name'], exception=e)
+    return False
+
+def publish_to_destination(destination, open_products, total=None):
+    """Upload all products to one store and return its progress
+
+    open_products returns a fresh iterator of transformed products, so every store can
+    stream them independently.
+    """
+    progress = {"name": destination['name'], "uploaded": 0, "failed": 0, "failures": []}
+    try:
+        context = prepare_destination(destination)
+    except Exception as e:
+        print(f"❌ [{destination['name']}] Could not prepare store: {str(e)}")
+        # Nothing reaches this store, so every product counts as failed
+        progress["failed"] = total if total is not None else sum(1 for _ in open_products())
+        progress["failures"].append(f"store could not be prepared: {str(e)}")
+        return progress
+
+    # Products uploaded after their last scrape are up to date on this store; changed
+    # ones are sent again and updated in place
+    done = {url for url, state in context['uploads'].items() if state['up_to_date']}
+    skipped = 0
+    progress_lock = threading.Lock()
+    of_total = f"/{total}" if total is not None else ""
+
+    def upload(numbered):
+        i, product = numbered
+        if stop_event.is_set():
+            return
+        print(f"\n--- [{destination['name']}] Processing product {i}{of_total} ---")
+        uploaded = upload_product(product, context)
+        with progress_lock:
+            if uploaded:
+                progress["uploaded"] += 1
+            else:
+                progress["failed"] += 1
+                progress["failures"].append(product['name'])
+
+    # Workers share the store's rate limit through the scheduler; products are handed
+    # over in small batches so a large stream is never held in memory at once
+    products = enumerate(open_products(), start=1)
+    batch_size = destination['workers'] * 4
+    with ThreadPoolExecutor(max_workers=destination['workers']) as executor:
+        for batch in iter(lambda: list(islice(products, batch_size)), []):
+            if stop_event.is_set():
+                break
+            pending = [(i, product) for i, product in batch if product.get('source_url') not in done]
+            skipped += len(batch) - len(pending)
+            list(executor.map(upload, pending))
 
-        print(f"\n✅ Finished processing. Successfully uploaded {success_count}/{len(products)} products")
+    if skipped:
+        print(f"⏩ [{destination['name']}] {skipped} products are already up to date")
+    print(f"\n✅ [{destination['name']}] Finished. Successfully uploaded {progress['uploaded']}"
+          f"/{progress['uploaded'] + progress['failed']} products")
+    return progress
+
+def process_products(payloads_file=None):
+    """Main function to process products
+
+    With payloads_file, precompiled payloads (see compile_payloads.py) are streamed from
+    disk. Otherwise the catalog is compiled once into a temporary payloads file that every
+    store streams, so products are transformed once without being held in memory.
+    """
+    # Imported here since compile_payloads itself imports this module
+    from compile_payloads import compile_payloads, read_payloads
+
+    temporary_file = None
+    try:
+        destinations = load_destinations()
+        print(f"ℹ️ Publishing to {len(destinations)} store(s): {', '.join(d['name'] for d in destinations)}")
+
+        if payloads_file:
+            print(f"\n📂 Streaming precompiled payloads from {payloads_file}...")
+            total = None
+        else:
+            print(f"\n📂 Transforming products from the catalog...")
+            fd, temporary_file = tempfile.mkstemp(prefix="payloads_", suffix=".jsonl.gz", dir=".")
+            os.close(fd)
+            payloads_file = temporary_file
+            total = compile_payloads(payloads_file)
+            print(f"\n🔄 Starting to process {total} products...")
+        open_products = lambda: read_payloads(payloads_file)
+
+        # One worker per store so a slow store does not hold back the others
+        executor = ThreadPoolExecutor(max_workers=len(destinations))
+        futures = [executor.submit(publish_to_destination, d, open_products, total) for d in destinations]
+        try:
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        print("\n📊 Summary per store:")
+        for progress in results:
+            print(f"  {progress['name']}: {progress['uploaded']} uploaded, {progress['failed']} failed")
+            for name in progress["failures"]:
+                print(f"    ❌ {name}")
 
     except KeyboardInterrupt:
         print("\n⚠️ Process interrupted by user")
     except Exception as e:
         print(f"❌ Fatal error: {str(e)}")
+    finally:
+        for path in (temporary_file, f"{temporary_file}.tmp") if temporary_file else ():
+            if os.path.exists(path):
+                os.remove(path)
 
 if __name__ == "__main__":
     print("🛒 Starting WooCommerce Product Import")
     print("------------------------------------")
-    process_products()
-    print("\n✅ Import process completed")
-
-
-
+    # Optional argument: precompiled payloads file
+    process_products(*sys.argv[1:2])
@@ -1,36 +1,32 @@
 #product.py file
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-import csv
-
-options = webdriver.ChromeOptions()
-options.add_argument('--headless')  # Headless mode
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
+from concurrent.futures import ThreadPoolExecutor
 
-def read_urls_from_csv(filename='extracted2_urls.csv'):
-    urls = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row:  # skip empty rows
-                urls.append(row[0].strip())
-    return urls
+from browser import load_page, quit_driver, wait_until_settled
+from catalog import department_urls, save_listing
+
+PRODUCT_GRID_XPATH = "//div[contains(@class, 'grid grid-cols-2')]/div[contains(@class, 'text-3')]"
+# Site navigation (the links data.py reads), present on every rendered page whether or not
+# the department has products
+PAGE_READY_XPATH = "//*[contains(@class, 'nav-link-title')]"
 
 def scrape_products(url):
-    driver.get(url)
-    time.sleep(3)  # Wait for page to load
+    from selenium.webdriver.common.by import By
+
+    driver = load_page(url, PAGE_READY_XPATH)  # Wait for page to load
+    # A page that never rendered is a failed scrape, not an empty department; otherwise
+    # every product in it would be marked removed
+    if not driver.find_elements(By.XPATH, PAGE_READY_XPATH):
+        raise RuntimeError(f"Page did not render: {url}")
+    wait_until_settled(driver, PRODUCT_GRID_XPATH)  # empty departments settle at zero
     
-    # Scroll to load products  driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(2)
+    # Scroll to load products
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    wait_until_settled(driver, PRODUCT_GRID_XPATH)
     
     products_data = []
     
     # Find all product containers
-    products = driver.find_elements(By.XPATH, "//div[contains(@class, 'grid grid-cols-2')]/div[contains(@class, 'text-3')]")
+    products = driver.find_elements(By.XPATH, PRODUCT_GRID_XPATH)
     
     for product in products:
         try:
@@ -52,30 +48,44 @@ def scrape_products(url):
     
     return products_data
 
-def save_to_csv(data, filename='products.csv'):
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['name', 'price', 'link', 'image_url', 'source_url']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+def scrape_department(url):
+    print(f"Scraping {url}...")
+    try:
+        return scrape_products(url)
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
 
-if __name__ == "__main__":
+def main(workers=1, queue=None):
     try:
-        print("Reading URLs from urls.csv...")
-        urls = read_urls_from_csv()
+        urls = department_urls("sub")
+        print(f"Read {len(urls)} department URLs from the catalog...")
+        
+        if queue:
+            # Workers on other nodes share the departments through the queue
+            from work_queue import run_distributed
+            run_distributed("department", urls, queue, threads=workers)
+            return
         
-        all_products = []
-        for url in urls:
-            print(f"Scraping {url}...")
-            products = scrape_products(url)
-            all_products.extend(products)
+        # Each worker drives its own browser; the scheduler keeps the site's request rate
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(scrape_department, urls))
+        all_products = [product for products in results if products for product in products]
         
+        # Products can only be declared removed from departments that were read
+        read = [url for url, products in zip(urls, results) if products is not None]
         print(f"Scraped total {len(all_products)} products.")
-        save_to_csv(all_products)
-        print("Data saved to products.csv")
+        counts = save_listing(all_products, departments=read)
+        print(f"Data saved to the catalog: {counts['new']} new, {counts['changed']} changed, "
+              f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+        if len(read) < len(urls):
+            print(f"⚠️ {len(urls) - len(read)} department(s) failed; their products were not checked for removal")
         
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        driver.quit()
+        quit_driver()
+
+if __name__ == "__main__":
+    main()
 
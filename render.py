@@ -0,0 +1,191 @@
+#render.py
+import hashlib
+import json
+import re
+import threading
+from html import escape
+from html.parser import HTMLParser
+from string import Formatter
+
+from catalog import load_rendered, save_rendered
+
+# Bump when the template or sanitizer changes so cached descriptions are re-rendered
+TEMPLATE_VERSION = 1
+
+
+def compile_template(template):
+    """Split a {field} template into (literal, field) pairs once, at import time"""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+def fill(compiled, values):
+    return "".join(literal + values[field] if field else literal for literal, field in compiled)
+
+
+DESCRIPTION_TEMPLATE = compile_template(
+    "<h2>{price}</h2>"
+    "{specifications}"
+    "<hr><div class=\"product-description\">{description}</div>"
+)
+SPECIFICATIONS_TEMPLATE = compile_template(
+    "<div class=\"product-attributes\"><h3>Specifications</h3><table>{rows}</table></div>"
+)
+ROW_TEMPLATE = compile_template("<tr><td><strong>{key}</strong></td><td>{value}</td></tr>")
+
+# Tags and attributes kept from the source description; everything else is unwrapped
+ALLOWED_TAGS = {
+    "p", "br", "hr", "strong", "b", "em", "i", "u", "s", "sub", "sup", "span",
+    "ul", "ol", "li", "h2", "h3", "h4", "h5", "h6", "blockquote",
+    "table", "thead", "tbody", "tr", "th", "td", "a", "img"
+}
+ALLOWED_ATTRIBUTES = {"a": {"href", "title"}, "img": {"src", "alt"}, "td": {"colspan", "rowspan"}, "th": {"colspan", "rowspan"}}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped together with their content
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template", "svg", "form"}
+# Dropped tags that never have content or an end tag
+DROPPED_VOID_TAGS = {"embed"}
+SAFE_URL = re.compile(r"^(https?:|mailto:|/|#)", re.IGNORECASE)
+
+BLOCK_TAGS = "p|br|hr|ul|ol|li|h[2-6]|blockquote|table|thead|tbody|tr|th|td|div"
+SPACE_AROUND_BLOCKS = re.compile(rf"\s*(</?(?:{BLOCK_TAGS})\b[^>]*>)\s*")
+WHITESPACE = re.compile(r"\s+")
+
+CACHE_SIZE = 10000
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class _Sanitizer(HTMLParser):
+    """Rebuild HTML keeping only allowed tags/attributes, with whitespace collapsed"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_VOID_TAGS:
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, ())
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in ("href", "src") and not SAFE_URL.match(value.strip()):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        self.parts.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            return  # self-closing, e.g. <svg/>: nothing to drop and no end tag will follow
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_VOID_TAGS:
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays well-formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(WHITESPACE.sub(" ", data), quote=False))
+
+    def result(self):
+        self.close()
+        self.parts.extend(f"</{tag}>" for tag in reversed(self.open_tags))
+        return SPACE_AROUND_BLOCKS.sub(r"\1", "".join(self.parts)).strip()
+
+
+def sanitize_html(source_html):
+    """Strip unsafe or unknown markup from scraped HTML and minify it"""
+    if not source_html:
+        return ""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(source_html)
+    return sanitizer.result()
+
+
+def content_hash(product_data):
+    """Hash of everything the description depends on"""
+    content = json.dumps(
+        [TEMPLATE_VERSION, product_data.get('price'), product_data.get('features') or {},
+         product_data.get('full_description_html')],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _render(product_data):
+    features = product_data.get('features') or {}
+    rows = "".join(
+        fill(ROW_TEMPLATE, {"key": escape(str(key)), "value": escape(str(value))})
+        for key, value in features.items() if value
+    )
+    return fill(DESCRIPTION_TEMPLATE, {
+        "price": escape(str(product_data.get('price') or '')),
+        "specifications": fill(SPECIFICATIONS_TEMPLATE, {"rows": rows}) if rows else "",
+        "description": sanitize_html(product_data.get('full_description_html'))
+    })
+
+
+def render_description(product_data):
+    """Product description HTML, memoized by content hash in memory and in the catalog"""
+    key = content_hash(product_data)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    html = load_rendered(key)
+    if html is None:
+        html = _render(product_data)
+        save_rendered(key, html)
+
+    with _cache_lock:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = html
+    return html
+
+
+# Sanitizer regressions: python render.py
+SANITIZER_CHECKS = [
+    ("<p>A</p><script>alert(1)</script><p>B</p>", "<p>A</p><p>B</p>"),
+    # Void and self-closing dropped tags must not swallow the rest of the description
+    ("<p>A</p><embed src='x.swf'><p>B must survive</p>", "<p>A</p><p>B must survive</p>"),
+    ("<p>A</p><svg/><p>B must survive</p>", "<p>A</p><p>B must survive</p>"),
+    ("<p>A</p><iframe src='x'/><p>B must survive</p>", "<p>A</p><p>B must survive</p>"),
+    ("<p>A</p><embed src='x'></embed><p>B</p>", "<p>A</p><p>B</p>"),
+]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for source, expected in SANITIZER_CHECKS:
+        result = sanitize_html(source)
+        if result != expected:
+            failed += 1
+            print(f"❌ {source!r}: expected {expected!r}, got {result!r}")
+    print(f"✅ {len(SANITIZER_CHECKS) - failed}/{len(SANITIZER_CHECKS)} sanitizer checks passed")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,203 @@
+#scheduler.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+# Request rate per host: (requests per second, burst). Everything that fetches a
+# page or calls an API waits on the host's bucket first, so concurrent workers share
+# one limit per host instead of each sleeping on its own.
+RATE_LIMITS = {
+    "abmltd.co.ke": (0.5, 1),  # source site
+}
+DEFAULT_RATE_LIMIT = (1.0, 1)
+
+# Optional overrides, re-read while running when the file changes, e.g.
+# {"abmltd.co.ke": {"rate": 1.0, "burst": 2}, "api.sooq.africa": {"rate": 5}}
+RATE_LIMITS_FILE = "rate_limits.json"
+RELOAD_INTERVAL = 5  # seconds between checks of RATE_LIMITS_FILE
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request is allowed"""
+
+    def __init__(self, rate, burst=1):
+        self.lock = threading.Lock()
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate, burst=None):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1.0, float(burst))
+                self.tokens = min(self.tokens, self.burst)
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            # Sleep outside the lock; re-check afterwards since the rate may have changed
+            time.sleep(min(wait, RELOAD_INTERVAL))
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a SQLite file, so processes on several nodes
+    share one limit; node clocks must be in sync"""
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS rate_buckets (host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+
+    def __init__(self, path, host, rate, burst=1):
+        self.path = path
+        self.host = host
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+
+    def set_rate(self, rate, burst=None):
+        self.rate = float(rate)
+        if burst is not None:
+            self.burst = max(1.0, float(burst))
+
+    def _take(self, conn):
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE host = ?", (self.host,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (host, tokens, updated) VALUES (?, ?, ?)",
+                         (self.host, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            conn.execute(self.SCHEMA)
+            while True:
+                wait = self._take(conn)
+                if not wait:
+                    return
+                time.sleep(min(wait, RELOAD_INTERVAL))
+        finally:
+            conn.close()
+
+
+class HostScheduler:
+    """One token bucket per host, with limits adjustable at runtime"""
+
+    def __init__(self, limits=None, limits_file=RATE_LIMITS_FILE):
+        self.lock = threading.Lock()
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.overrides = {}
+        self.buckets = {}
+        self.shared_path = None
+        self.limits_file = limits_file
+        self.file_mtime = None
+        self.last_check = -RELOAD_INTERVAL
+
+    def _limit(self, host):
+        return self.overrides.get(host) or self.limits.get(host) or DEFAULT_RATE_LIMIT
+
+    def bucket(self, host):
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                if self.shared_path:
+                    bucket = SharedTokenBucket(self.shared_path, host, *self._limit(host))
+                else:
+                    bucket = TokenBucket(*self._limit(host))
+                self.buckets[host] = bucket
+            return bucket
+
+    def share(self, path):
+        """Keep the buckets in a SQLite file shared with other nodes from now on"""
+        with self.lock:
+            self.shared_path = path
+            self.buckets = {}
+
+    def set_limit(self, host, rate, burst=1):
+        """Set the default limit for a host; entries in the limits file still win"""
+        with self.lock:
+            self.limits[host] = (rate, burst)
+            bucket = self.buckets.get(host)
+        if bucket and host not in self.overrides:
+            bucket.set_rate(rate, burst)
+
+    def _parse_limit(self, host, limit):
+        """(rate, burst) from a limits file entry, or None with a warning if it is invalid"""
+        try:
+            rate = float(limit["rate"])
+            burst = float(limit.get("burst", 1))
+        except (TypeError, KeyError, ValueError, AttributeError):
+            print(f"⚠️ Ignoring rate limit for {host} in {self.limits_file}: expected {{\"rate\": <number>}}")
+            return None
+        if rate <= 0 or burst <= 0:
+            print(f"⚠️ Ignoring rate limit for {host} in {self.limits_file}: rate and burst must be positive")
+            return None
+        return rate, burst
+
+    def reload(self):
+        """Apply the limits file if it changed since the last check"""
+        if not self.limits_file or not os.path.exists(self.limits_file):
+            return
+        mtime = os.path.getmtime(self.limits_file)
+        if mtime == self.file_mtime:
+            return
+        try:
+            with open(self.limits_file, 'r', encoding='utf-8') as f:
+                configured = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {self.limits_file}: {e}")
+            return
+        if not isinstance(configured, dict):
+            print(f"⚠️ Could not read {self.limits_file}: expected an object of host limits")
+            return
+        overrides = {}
+        for host, limit in configured.items():
+            parsed = self._parse_limit(host, limit)
+            if parsed:
+                overrides[host] = parsed
+        with self.lock:
+            self.file_mtime = mtime
+            self.overrides = overrides
+            buckets = dict(self.buckets)
+        for host, bucket in buckets.items():
+            bucket.set_rate(*self._limit(host))
+        print(f"ℹ️ Rate limits loaded from {self.limits_file}")
+
+    def wait(self, url):
+        """Block until a request to the URL's host is allowed"""
+        now = time.monotonic()
+        if now - self.last_check >= RELOAD_INTERVAL:
+            self.last_check = now
+            self.reload()
+        self.bucket(urlparse(url).netloc.lower()).acquire()
+
+
+# Shared by every fetcher in the process
+scheduler = HostScheduler()
+
+
+def wait_for(url):
+    scheduler.wait(url)
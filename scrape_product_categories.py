@@ -1,13 +1,14 @@
 #scrpae_product_caterogies.py
 import requests
 from bs4 import BeautifulSoup
-import csv
 import os
+
+from catalog import save_departments
+from scheduler import wait_for
 
 url = "https://abmltd.co.ke/" #paste your website url
 
 html_file = "abm_printers_page.html"
-csv_file = "extracted2_urls.csv"
 
 def scrape_and_save_html():
     try:
@@ -15,6 +16,7 @@ def scrape_and_save_html():
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        wait_for(url)
         response = requests.get(url, headers=headers)
         response.raise_for_status()  # Raise exception for bad status codes
         
@@ -50,13 +52,10 @@ def extract_urls_from_html():
                     href = f"https://abmltd.co.ke{href}" if href.startswith('/') else f"https://abmltd.co.ke/{href}"
                 urls.append(href)
         
-        # Save URLs to CSV
-        with open(csv_file, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Extracted URLs'])  # Header
-            writer.writerows([[url] for url in urls])
+        # Save URLs to the catalog
+        save_departments(urls, "sub")
         
-        print(f"Extracted {len(urls)} URLs and saved to {csv_file}")
+        print(f"Extracted {len(urls)} URLs and saved to the catalog")
         
     except Exception as e:
         print(f"Error processing HTML: {e}")
@@ -0,0 +1,302 @@
+#work_queue.py
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from browser import quit_driver
+from catalog import save_listing, save_product
+from dead_letter import record_failure, record_id, resolve
+from scheduler import scheduler
+
+# Shared queue of department and product URLs. Put it on storage every node can reach
+# and start workers on each node; whoever runs the list/detail stage collects the
+# results into its catalog.
+QUEUE_DB = "work_queue.db"
+
+LEASE_SECONDS = 300  # a task not completed within this time is handed to another worker
+MAX_ATTEMPTS = 3  # leases per task before it is given up as failed
+POLL_INTERVAL = 5  # seconds between checks while other workers hold all open tasks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,                -- 'department' (listing page) or 'product' (detail page)
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,              -- pending / leased / done / failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,                -- unix time, so node clocks must be in sync
+    result TEXT,                       -- JSON of the scrape result
+    error TEXT,
+    collected INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    UNIQUE (kind, url)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_kind_status ON tasks(kind, status);
+"""
+
+stop_event = threading.Event()
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def connect(path=None):
+    """Open the queue; autocommit, writes take the lock explicitly with BEGIN IMMEDIATE"""
+    # Rollback journal rather than WAL, which does not work on network filesystems
+    conn = sqlite3.connect(path or QUEUE_DB, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _write(conn, *statement):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute(*statement)
+        conn.execute("COMMIT")
+        return cursor
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def enqueue(kind, urls, path=None, fresh=False):
+    """Add URLs as pending tasks; fresh drops earlier tasks of this kind first"""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if fresh:
+            conn.execute("DELETE FROM tasks WHERE kind = ?", (kind,))
+        # Finished tasks are queued again; ones still pending or leased are left alone
+        conn.executemany(
+            "INSERT INTO tasks (kind, url, status, updated_at) VALUES (?, ?, 'pending', ?) "
+            "ON CONFLICT(kind, url) DO UPDATE SET status = 'pending', attempts = 0, result = NULL, "
+            "error = NULL, collected = 0, updated_at = excluded.updated_at "
+            "WHERE status IN ('done', 'failed')",
+            [(kind, url, now()) for url in dict.fromkeys(urls)]
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def lease(conn, owner, kinds):
+    """Claim the next pending task, or one whose lease expired; None when there is none"""
+    placeholders = ", ".join("?" for _ in kinds)
+    leased_at = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Tasks that keep losing their worker are given up rather than leased forever
+        conn.execute(
+            f"UPDATE tasks SET status = 'failed', error = 'lease expired', lease_owner = NULL, updated_at = ? "
+            f"WHERE kind IN ({placeholders}) AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now(), *kinds, leased_at, MAX_ATTEMPTS)
+        )
+        task = conn.execute(
+            f"SELECT id, kind, url, attempts FROM tasks WHERE kind IN ({placeholders}) "
+            f"AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) ORDER BY id LIMIT 1",
+            (*kinds, leased_at)
+        ).fetchone()
+        if task:
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (owner, leased_at + LEASE_SECONDS, now(), task["id"])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return dict(task) if task else None
+
+
+def complete(conn, task, result):
+    """Store a task's result; returns False if another worker already completed it"""
+    cursor = _write(
+        conn,
+        "UPDATE tasks SET status = 'done', result = ?, error = NULL, collected = 0, lease_owner = NULL, "
+        "lease_expires = NULL, updated_at = ? WHERE id = ? AND status != 'done'",
+        (json.dumps(result, ensure_ascii=False), now(), task["id"])
+    )
+    return cursor.rowcount > 0
+
+
+def fail(conn, task, owner, error):
+    """Release a task for another attempt, or mark it failed once MAX_ATTEMPTS is used up"""
+    _write(
+        conn,
+        "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+        "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+        "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+        (MAX_ATTEMPTS, error, now(), task["id"], owner)
+    )
+
+
+def open_tasks(conn, kinds):
+    placeholders = ", ".join("?" for _ in kinds)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM tasks WHERE kind IN ({placeholders}) AND status IN ('pending', 'leased')", kinds
+    ).fetchone()[0]
+
+
+def scrape_department(url):
+    import product
+
+    return product.scrape_products(url)
+
+
+def scrape_product_page(url):
+    import final
+
+    product_data = final.scrape_product(url)
+    if not product_data["title"]:
+        raise ValueError("Title not found on product page")
+    return product_data
+
+
+SCRAPERS = {
+    "department": scrape_department,
+    "product": scrape_product_page,
+}
+
+
+def _work(path, owner, kinds, wait):
+    conn = connect(path)
+    done = 0
+    try:
+        while not stop_event.is_set():
+            task = lease(conn, owner, kinds)
+            if task is None:
+                # Other workers may still hold leases that expire; keep polling until all are closed
+                if not wait and not open_tasks(conn, kinds):
+                    break
+                stop_event.wait(POLL_INTERVAL)
+                continue
+
+            print(f"🔧 [{owner}] {task['kind']} {task['url']} (attempt {task['attempts'] + 1})")
+            try:
+                result = SCRAPERS[task["kind"]](task["url"])
+            except Exception as e:
+                print(f"❌ [{owner}] Error scraping {task['url']}: {e}")
+                fail(conn, task, owner, str(e))
+                continue
+            if complete(conn, task, result):
+                done += 1
+            else:
+                print(f"⏩ [{owner}] {task['url']} was already completed by another worker")
+    finally:
+        conn.close()
+    return done
+
+
+def run_worker(path=None, threads=1, kinds=None, wait=False):
+    """Lease and scrape tasks until the queue is drained (or forever with wait)"""
+    kinds = list(kinds or SCRAPERS)
+    host = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"👷 Worker {host} with {threads} thread(s) on {path or QUEUE_DB}")
+    # All nodes draw from the same per-host rate limits, kept in the queue database
+    scheduler.share(path or QUEUE_DB)
+    # Each thread drives its own browser through browser.get_driver()
+    executor = ThreadPoolExecutor(max_workers=threads)
+    futures = [executor.submit(_work, path, f"{host}-{i}", kinds, wait) for i in range(threads)]
+    try:
+        done = sum(future.result() for future in futures)
+    except KeyboardInterrupt:
+        # Stop the polling threads before waiting for them; a task they hold is
+        # released when its lease expires
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        quit_driver()
+    executor.shutdown()
+    print(f"✅ Worker {host} completed {done} task(s)")
+    return done
+
+
+def collect(path=None):
+    """Move finished results into the catalog; failed product pages go to the dead-letter store"""
+    conn = connect(path)
+    try:
+        departments = {row["status"]: row["n"] for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM tasks WHERE kind = 'department' GROUP BY status"
+        )}
+        uncollected = conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE kind = 'department' AND status IN ('done', 'failed') AND collected = 0"
+        ).fetchone()[0]
+        if departments.get("pending") or departments.get("leased"):
+            print("⏳ Department listings are still being scraped")
+        elif uncollected:
+            # A listing run is saved as a whole so products missing from the departments
+            # that were read can be marked removed
+            read, rows = [], []
+            for task in conn.execute("SELECT url, result FROM tasks WHERE kind = 'department' AND status = 'done'"):
+                read.append(task["url"])
+                rows.extend(json.loads(task["result"]))
+            counts = save_listing(rows, departments=read)
+            print(f"Data saved to the catalog: {counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+            if departments.get("failed"):
+                print(f"⚠️ {departments['failed']} department(s) failed; their products were not checked for removal")
+            _write(conn, "UPDATE tasks SET collected = 1 WHERE kind = 'department'")
+
+        saved = 0
+        for task in conn.execute(
+            "SELECT id, url, status, result, error FROM tasks "
+            "WHERE kind = 'product' AND status IN ('done', 'failed') AND collected = 0"
+        ).fetchall():
+            if task["status"] == "done":
+                save_product(json.loads(task["result"]))
+                resolve(record_id("detail", task["url"]))
+                saved += 1
+            else:
+                record_failure("detail", task["url"], task["error"] or "scrape failed", {"url": task["url"]},
+                               error_class="scrape")
+            _write(conn, "UPDATE tasks SET collected = 1 WHERE id = ?", (task["id"],))
+        if saved:
+            print(f"🎯 {saved} products saved to the catalog")
+    finally:
+        conn.close()
+
+
+def run_distributed(kind, urls, path=None, threads=1):
+    """Queue URLs, work on them alongside the other nodes and collect the results"""
+    enqueue(kind, urls, path, fresh=True)
+    print(f"📬 Queued {len(urls)} {kind} URL(s) on {path or QUEUE_DB}")
+    run_worker(path, threads, kinds=[kind])
+    collect(path)
+
+
+def show(path=None):
+    conn = connect(path)
+    try:
+        for row in conn.execute(
+            "SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status ORDER BY kind, status"
+        ):
+            print(f"{row['kind']:<11} {row['status']:<8} {row['n']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared scrape queue for running workers on several nodes")
+    parser.add_argument("command", choices=["worker", "status", "collect"])
+    parser.add_argument("--queue", default=QUEUE_DB, help="queue database on storage shared by all nodes")
+    parser.add_argument("--threads", type=int, default=1, help="browsers this worker runs in parallel")
+    parser.add_argument("--wait", action="store_true", help="keep polling for new tasks instead of exiting when drained")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_worker(args.queue, args.threads, wait=args.wait)
+    elif args.command == "collect":
+        collect(args.queue)
+    else:
+        show(args.queue)